@@ -1,21 +1,70 @@
-from fastapi import Depends, HTTPException, status
+import threading
+from cachetools import TTLCache
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.core.security import verify_token
 from app.crud.user import get_user_by_username
 from app.models.user import User
+from app.core.config import settings
 
 # Esquema de seguridad OAuth2 para la autenticación basada en tokens.
 # El token se espera en el encabezado 'Authorization: Bearer <token>'.
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+# Excepción de credenciales inválidas, creada una sola vez en lugar de en cada petición.
+# Se lanza con `.with_traceback(None)` para que su traceback no crezca al reutilizarla.
+CREDENTIALS_EXCEPTION = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="No se pudieron validar las credenciales",
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
+# Caché username -> id de usuario, con el mismo TTL que la de tokens: permite cargar el
+# usuario por clave primaria. No se cachean objetos User porque pertenecen a la sesión de
+# cada petición, y así los cambios (p. ej. is_active) se ven de inmediato.
+_user_id_cache = TTLCache(maxsize=settings.TOKEN_CACHE_MAXSIZE, ttl=settings.TOKEN_CACHE_TTL_SECONDS)
+_user_id_cache_lock = threading.Lock()
+
+def _get_user_for_token_subject(db: Session, username: str):
+    """Carga el usuario del token, por clave primaria si su ID está en caché."""
+    if not settings.TOKEN_CACHE_ENABLED:
+        return get_user_by_username(db, username=username)
+
+    with _user_id_cache_lock:
+        user_id = _user_id_cache.get(username)
+    if user_id is not None:
+        user = db.get(User, user_id)
+        if user is not None and user.username == username:
+            return user
+
+    user = get_user_by_username(db, username=username)
+    if user is not None:
+        with _user_id_cache_lock:
+            _user_id_cache[username] = user.id
+    return user
+
+# Marca que distingue "el middleware no decodificó el token" de "token inválido" (None)
+_NOT_DECODED = object()
+
+def get_current_user(
+    request: Request,
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> User:
     """
     Obtiene el usuario actual a partir de un token JWT válido.
     Esta función es una dependencia que se utiliza en las rutas protegidas de la API.
+    Si `AuthMiddleware` ya decodificó el token, se reutiliza `request.state.username`.
+    El usuario resuelto se guarda en `request.state.user`, de modo que el resto de la
+    petición puede reutilizarlo sin volver a decodificar el token ni consultar la base de datos.
+
+    Se mantiene síncrona a propósito: la sesión de base de datos es síncrona, y FastAPI
+    la ejecuta en el threadpool en lugar de bloquear el event loop.
 
     Args:
+        request (Request): La petición actual.
         token (str): El token JWT extraído del encabezado de autorización.
         db (Session): La sesión de la base de datos.
 
@@ -25,20 +74,21 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     Returns:
         User: El objeto User correspondiente al token.
     """
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="No se pudieron validar las credenciales",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+    user = getattr(request.state, "user", None)
+    if user is not None:
+        return user
     
-    username = verify_token(token)
+    username = getattr(request.state, "username", _NOT_DECODED)
+    if username is _NOT_DECODED:
+        username = verify_token(token)
     if username is None:
-        raise credentials_exception
+        raise CREDENTIALS_EXCEPTION.with_traceback(None)
     
-    user = get_user_by_username(db, username=username)
+    user = _get_user_for_token_subject(db, username)
     if user is None:
-        raise credentials_exception
+        raise CREDENTIALS_EXCEPTION.with_traceback(None)
     
+    request.state.user = user
     return user
 
 def get_active_user(current_user: User = Depends(get_current_user)) -> User:
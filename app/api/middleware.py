@@ -0,0 +1,27 @@
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.core.security import verify_token
+
+class AuthMiddleware:
+    """
+    Middleware ASGI que decodifica el token Bearer una sola vez por petición.
+    El nombre de usuario resultante (o None si el token no es válido) queda en
+    `request.state.username`, y `get_current_user` lo reutiliza en lugar de volver a
+    verificar el token.
+
+    La búsqueda del usuario en la base de datos se deja en la dependencia, que usa la
+    sesión inyectada por `get_db` y se ejecuta en el threadpool.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            authorization = Headers(scope=scope).get("authorization")
+            if authorization:
+                scheme, _, token = authorization.partition(" ")
+                if scheme.lower() == "bearer" and token:
+                    # Starlette expone scope["state"] como `request.state`
+                    scope.setdefault("state", {})["username"] = verify_token(token)
+        await self.app(scope, receive, send)
@@ -1,11 +1,12 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.schemas.user import User, UserCreate, Token
-from app.crud.user import create_user, authenticate_user, get_user_by_email, get_user_by_username
+from app.crud.user import create_user, authenticate_user, get_user_by_email_or_username
 from app.core.security import create_access_token
 from app.core.config import settings
 
@@ -16,15 +17,16 @@ router = APIRouter(
 
 @router.post("/register", response_model=User)
 def register_user(user: UserCreate, db: Session = Depends(get_db)):
-    # Check for existing email
-    if get_user_by_email(db, email=user.email):
+    # Check for existing email or username in a single query
+    existing = get_user_by_email_or_username(db, email=user.email, username=user.username)
+    
+    if any(email == user.email for email, _ in existing):
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="Email already registered"
         )
     
-    # Check for existing username
-    if get_user_by_username(db, username=user.username):
+    if existing:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="Username already taken"
@@ -32,6 +34,12 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
     
     try:
         return create_user(db=db, user=user)
+    except IntegrityError:
+        # A concurrent registration won the race after the pre-check
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Email or username already registered"
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -1,18 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import threading
+from cachetools import TTLCache
+from fastapi import APIRouter, Depends, HTTPException, status, Response
 from sqlalchemy.orm import Session
 from typing import List
 
 from app.database import get_db
-from app.schemas.location import Category, CategoryCreate
+from app.schemas.location import Category, CategoryCreate, CategoryListAdapter, construct_from_orm
 from app.crud import location as crud_location
 from app.api.dependencies import get_active_user # Importar la dependencia de usuario activo
 from app.models.user import User # Importar el modelo de usuario
+from app.core.config import settings
 
 router = APIRouter(
     tags=["Categories"],
     responses={404: {"description": "Not found"}},
 )
 
+# Caché en memoria del listado de categorías ya serializado a JSON, indexada por (skip, limit).
+# Las categorías cambian muy poco y se leen en cada listado; se invalida al crear una.
+_categories_cache = TTLCache(maxsize=128, ttl=settings.CATEGORIES_CACHE_TTL_SECONDS)
+_categories_cache_lock = threading.Lock()
+# Se incrementa en cada invalidación: un listado leído de la DB antes de una invalidación
+# concurrente no debe guardarse en la caché (quedaría obsoleto durante todo el TTL)
+_categories_cache_generation = 0
+
+def invalidate_categories_cache() -> None:
+    """Vacía la caché del listado de categorías."""
+    global _categories_cache_generation
+    with _categories_cache_lock:
+        _categories_cache_generation += 1
+        _categories_cache.clear()
+
 @router.get("/", response_model=List[Category])
 def get_categories(
     skip: int = 0,
@@ -32,8 +50,24 @@ def get_categories(
     Returns:
         List[Category]: Una lista de objetos Category.
     """
-    categories = crud_location.get_categories(db, skip=skip, limit=limit)
-    return categories
+    cache_key = (skip, limit)
+    with _categories_cache_lock:
+        content = _categories_cache.get(cache_key)
+        generation = _categories_cache_generation
+
+    if content is None:
+        # Filas de la base de datos: se construyen sin revalidar (ver construct_from_orm)
+        categories = [
+            construct_from_orm(Category, category)
+            for category in crud_location.get_categories(db, skip=skip, limit=limit)
+        ]
+        content = CategoryListAdapter.dump_json(categories)
+        if settings.CATEGORIES_CACHE_TTL_SECONDS > 0:
+            with _categories_cache_lock:
+                if generation == _categories_cache_generation:
+                    _categories_cache[cache_key] = content
+
+    return Response(content=content, media_type="application/json")
 
 @router.post("/", response_model=Category, status_code=status.HTTP_201_CREATED)
 def create_category(
@@ -52,7 +86,9 @@ def create_category(
     Returns:
         Category: El objeto Category recién creado.
     """
-    return crud_location.create_category(db=db, category=category)
+    db_category = crud_location.create_category(db=db, category=category)
+    invalidate_categories_cache()
+    return db_category
 
 @router.get("/{category_id}", response_model=Category)
 def get_category(
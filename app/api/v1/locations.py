@@ -1,19 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Body, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
 from typing import List
 
 from app.database import get_db
-from app.schemas.location import Location, LocationCreate, LocationUpdate, LocationSearch
+from app.schemas.location import (
+    Location, LocationCreate, LocationUpdate, LocationSearch, LocationSummary,
+    LocationSummaryListAdapter, LocationWithCategory, construct_from_orm
+)
 from app.crud import location as crud_location
 from app.api.dependencies import get_active_user
 from app.models.user import User
+from app.core.config import settings
 
 router = APIRouter(
     tags=["Locations"],
     responses={404: {"description": "Not found"}},
 )
 
-@router.get("/", response_model=List[Location])
+@router.get("/", response_model=List[LocationSummary])
 def get_my_locations(
     skip: int = 0,
     limit: int = 100,
@@ -30,12 +34,15 @@ def get_my_locations(
         db (Session): La sesión de la base de datos, inyectada por la dependencia `get_db`.
 
     Returns:
-        List[Location]: Una lista de objetos Location.
+        List[LocationSummary]: Una lista de ubicaciones en su forma reducida.
     """
     locations = crud_location.get_user_locations(db, user_id=current_user.id, skip=skip, limit=limit)
-    return locations
+    # Filas de la base de datos: se construyen sin revalidar (ver construct_from_orm)
+    # y la lista se serializa de una vez, sin pasar por la validación de respuesta de FastAPI
+    summaries = [construct_from_orm(LocationSummary, location) for location in locations]
+    return Response(content=LocationSummaryListAdapter.dump_json(summaries), media_type="application/json")
 
-@router.post("/", response_model=Location, status_code=status.HTTP_201_CREATED)
+@router.post("/", response_model=LocationWithCategory, status_code=status.HTTP_201_CREATED)
 def create_location(
     location: LocationCreate,
     current_user: User = Depends(get_active_user),
@@ -50,7 +57,7 @@ def create_location(
         db (Session): La sesión de la base de datos.
 
     Returns:
-        Location: El objeto Location recién creado.
+        LocationWithCategory: El objeto Location recién creado, con su categoría.
     """
     if location.category_id is not None:
         category = crud_location.get_category_by_id(db, category_id=location.category_id)
@@ -59,7 +66,39 @@ def create_location(
 
     return crud_location.create_location(db=db, location=location, user_id=current_user.id)
 
-@router.get("/{location_id}", response_model=Location)
+@router.post("/bulk", response_model=List[LocationSummary], status_code=status.HTTP_201_CREATED)
+def create_locations_bulk(
+    locations: List[LocationCreate] = Body(..., min_length=1, max_length=settings.MAX_BULK_LOCATIONS),
+    current_user: User = Depends(get_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Crea varias ubicaciones del usuario autenticado en una sola petición y transacción.
+
+    Args:
+        locations (List[LocationCreate]): Los datos de las nuevas ubicaciones (como máximo `MAX_BULK_LOCATIONS`).
+        current_user (User): El usuario autenticado.
+        db (Session): La sesión de la base de datos.
+
+    Raises:
+        HTTPException: Si alguna de las categorías indicadas no existe; en ese caso no se crea ninguna ubicación.
+
+    Returns:
+        List[LocationSummary]: Las ubicaciones creadas (en su forma reducida), en el orden recibido.
+    """
+    category_ids = {location.category_id for location in locations if location.category_id is not None}
+    if category_ids - crud_location.get_existing_category_ids(db, category_ids):
+        raise HTTPException(status_code=404, detail="Categoría no encontrada. Por favor, proporcione un ID de categoría válido.")
+
+    db_locations = crud_location.create_locations(db, locations=locations, user_id=current_user.id)
+    summaries = [construct_from_orm(LocationSummary, location) for location in db_locations]
+    return Response(
+        content=LocationSummaryListAdapter.dump_json(summaries),
+        media_type="application/json",
+        status_code=status.HTTP_201_CREATED
+    )
+
+@router.get("/{location_id}", response_model=LocationWithCategory)
 def get_location(
     location_id: int,
     current_user: User = Depends(get_active_user),
@@ -77,14 +116,14 @@ def get_location(
         HTTPException: Si la ubicación no se encuentra o no pertenece al usuario.
 
     Returns:
-        Location: El objeto Location correspondiente al ID.
+        LocationWithCategory: El objeto Location correspondiente al ID, con su categoría.
     """
     db_location = crud_location.get_location_by_id(db, location_id=location_id, user_id=current_user.id)
     if db_location is None:
         raise HTTPException(status_code=404, detail="Ubicación no encontrada")
     return db_location
 
-@router.put("/{location_id}", response_model=Location)
+@router.put("/{location_id}", response_model=LocationWithCategory)
 def update_location(
     location_id: int,
     location_update: LocationUpdate,
@@ -104,7 +143,7 @@ def update_location(
         HTTPException: Si la ubicación no se encuentra o no pertenece al usuario.
 
     Returns:
-        Location: El objeto Location actualizado.
+        LocationWithCategory: El objeto Location actualizado, con su categoría.
     """
     db_location = crud_location.update_location(
         db, location_id=location_id, location_update=location_update, user_id=current_user.id
@@ -138,30 +177,35 @@ def delete_location(
         raise HTTPException(status_code=404, detail="Ubicación no encontrada")
     return db_location
 
-@router.get("/search/nearby", response_model=List[Location])
+@router.get("/search/nearby", response_model=List[LocationSummary])
 def search_nearby_locations(
-    center_lat: float = Query(..., description="Latitud del centro de búsqueda"),
-    center_lng: float = Query(..., description="Longitud del centro de búsqueda"),
+    center_lat: float = Query(..., ge=-90, le=90, description="Latitud del centro de búsqueda"),
+    center_lng: float = Query(..., ge=-180, le=180, description="Longitud del centro de búsqueda"),
     radius_km: float = Query(..., description="Radio de búsqueda en kilómetros", gt=0),
+    skip: int = Query(0, ge=0, description="Número de resultados a omitir"),
+    limit: int = Query(settings.DEFAULT_SEARCH_LIMIT, ge=1, le=500, description="Número máximo de resultados"),
     current_user: User = Depends(get_active_user),
     db: Session = Depends(get_db)
 ):
     """
     Busca ubicaciones cercanas a un punto geográfico dado para el usuario autenticado.
+    Los resultados se ordenan por distancia y el radio se limita a `MAX_SEARCH_RADIUS_KM`.
 
     Args:
         center_lat (float): Latitud del punto central para la búsqueda.
         center_lng (float): Longitud del punto central para la búsqueda.
         radius_km (float): El radio en kilómetros dentro del cual buscar ubicaciones.
+        skip (int): Número de resultados a omitir (para paginación).
+        limit (int): Número máximo de resultados a devolver (para paginación).
         current_user (User): El usuario autenticado.
         db (Session): La sesión de la base de datos.
 
     Returns:
-        List[Location]: Una lista de objetos Location que se encuentran dentro del radio especificado.
+        List[LocationSummary]: Las ubicaciones (en su forma reducida) que se encuentran dentro del radio especificado.
     """
-    # TODO: Considerar implementar paginación para resultados de búsqueda grandes
-    # TODO: Evaluar el uso de una extensión espacial de DB (ej. PostGIS) para búsquedas geográficas más eficientes en producción.
     locations = crud_location.search_locations_nearby(
-        db, user_id=current_user.id, center_lat=center_lat, center_lng=center_lng, radius_km=radius_km
+        db, user_id=current_user.id, center_lat=center_lat, center_lng=center_lng, radius_km=radius_km,
+        skip=skip, limit=limit
     )
-    return locations
\ No newline at end of file
+    summaries = [construct_from_orm(LocationSummary, location) for location in locations]
+    return Response(content=LocationSummaryListAdapter.dump_json(summaries), media_type="application/json")
\ No newline at end of file
@@ -1,33 +1,90 @@
 import os
-from functools import lru_cache
+from dataclasses import dataclass, field
 from dotenv import load_dotenv
 
 load_dotenv()
 
+def _env(name: str, default: str, cast=str):
+    """Campo de configuración leído de la variable de entorno `name` al crear Settings."""
+    return field(default_factory=lambda: cast(os.getenv(name, default)))
+
+def _env_list(name: str, default: str):
+    """Campo de configuración con una lista separada por comas leída de la variable de entorno `name`."""
+    return field(default_factory=lambda: tuple(
+        item.strip() for item in os.getenv(name, default).split(",") if item.strip()
+    ))
+
+def _env_bool(name: str, default: str):
+    """Campo booleano de configuración ("true"/"false") leído de la variable de entorno `name`."""
+    return field(default_factory=lambda: os.getenv(name, default).lower() == "true")
+
+@dataclass(frozen=True, slots=True)
 class Settings:
     # App config
     PROJECT_NAME: str = "MapMyWorld API"
     VERSION: str = "1.0.0"
     DESCRIPTION: str = "Location management API"
-    DEBUG: bool = os.getenv("DEBUG", "False").lower() == "true"
+    DEBUG: bool = _env_bool("DEBUG", "False")
+    # Swagger UI, ReDoc y el esquema OpenAPI (desactivar en producción)
+    ENABLE_DOCS: bool = _env_bool("ENABLE_DOCS", "True")
+    # Hilos disponibles para los endpoints síncronos (AnyIO usa 40 por defecto)
+    THREADPOOL_SIZE: int = _env("THREADPOOL_SIZE", "100", int)
     
     # Database
-    DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./mapmyworld.db")
+    DATABASE_URL: str = _env("DATABASE_URL", "sqlite:///./mapmyworld.db")
+    # Pool de conexiones (solo para bases de datos cliente/servidor, p. ej. PostgreSQL).
+    # DB_POOL_SIZE + DB_MAX_OVERFLOW debe cubrir THREADPOOL_SIZE (se valida al crear Settings)
+    DB_POOL_SIZE: int = _env("DB_POOL_SIZE", "20", int)
+    DB_MAX_OVERFLOW: int = _env("DB_MAX_OVERFLOW", "80", int)
+    DB_POOL_RECYCLE: int = _env("DB_POOL_RECYCLE", "1800", int)  # segundos
+    # Crear las tablas al arrancar (desarrollo); desactivar cuando el esquema se gestione aparte
+    AUTO_CREATE_TABLES: bool = _env_bool("AUTO_CREATE_TABLES", "True")
     
     # Security
-    SECRET_KEY: str = os.getenv("SECRET_KEY", "dev-key-change-in-production")
+    # Orígenes permitidos por CORS (lista separada por comas)
+    CORS_ORIGINS: tuple = _env_list("CORS_ORIGINS", "http://localhost:3000,http://localhost:8000")
+    SECRET_KEY: str = _env("SECRET_KEY", "dev-key-change-in-production")
+    SECRET_KEY_BYTES: bytes = field(init=False)
     ALGORITHM: str = "HS256"
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = _env("ACCESS_TOKEN_EXPIRE_MINUTES", "30", int)
+    # Caché opcional de tokens verificados (y de username -> id de usuario) para las rutas
+    # protegidas; desactivada por defecto
+    TOKEN_CACHE_ENABLED: bool = _env_bool("TOKEN_CACHE_ENABLED", "False")
+    TOKEN_CACHE_TTL_SECONDS: float = _env("TOKEN_CACHE_TTL_SECONDS", "5", float)
+    TOKEN_CACHE_MAXSIZE: int = _env("TOKEN_CACHE_MAXSIZE", "10000", int)
+    
+    # Password hashing (argon2id para hashes nuevos, bcrypt solo para hashes existentes).
+    # BCRYPT_ROUNDS se mantiene solo por compatibilidad con configuraciones anteriores: bcrypt
+    # está marcado como obsoleto, así que nunca se crean hashes bcrypt nuevos y no tiene efecto.
+    BCRYPT_ROUNDS: int = _env("BCRYPT_ROUNDS", "12", int)
+    ARGON2_TIME_COST: int = _env("ARGON2_TIME_COST", "2", int)
+    ARGON2_MEMORY_COST: int = _env("ARGON2_MEMORY_COST", "19456", int)  # KiB
+    ARGON2_PARALLELISM: int = _env("ARGON2_PARALLELISM", "1", int)
     
     # Rate limiting
-    REQUESTS_PER_MINUTE: int = int(os.getenv("REQUESTS_PER_MINUTE", "60"))
+    REQUESTS_PER_MINUTE: int = _env("REQUESTS_PER_MINUTE", "60", int)
     
     # Geo search defaults
-    MAX_SEARCH_RADIUS_KM: float = float(os.getenv("MAX_SEARCH_RADIUS_KM", "50.0"))
-    DEFAULT_SEARCH_LIMIT: int = int(os.getenv("DEFAULT_SEARCH_LIMIT", "100"))
+    MAX_SEARCH_RADIUS_KM: float = _env("MAX_SEARCH_RADIUS_KM", "50.0", float)
+    DEFAULT_SEARCH_LIMIT: int = _env("DEFAULT_SEARCH_LIMIT", "100", int)
+    # Máximo de ubicaciones por petición en POST /locations/bulk
+    MAX_BULK_LOCATIONS: int = _env("MAX_BULK_LOCATIONS", "1000", int)
+    
+    # Caché en memoria del listado de categorías (0 la desactiva)
+    CATEGORIES_CACHE_TTL_SECONDS: float = _env("CATEGORIES_CACHE_TTL_SECONDS", "60", float)
+
+    def __post_init__(self):
+        # La clave ya codificada se pasa tal cual a la librería JWT en cada firma/verificación
+        object.__setattr__(self, "SECRET_KEY_BYTES", self.SECRET_KEY.encode())
 
-@lru_cache()
-def get_settings():
-    return Settings()
+        # Cada endpoint síncrono ocupa un hilo y una conexión: con menos conexiones que hilos,
+        # las peticiones sobrantes esperarían 'pool_timeout' y fallarían con TimeoutError
+        pool_capacity = self.DB_POOL_SIZE + self.DB_MAX_OVERFLOW
+        if not self.DATABASE_URL.startswith("sqlite") and pool_capacity < self.THREADPOOL_SIZE:
+            raise ValueError(
+                f"DB_POOL_SIZE + DB_MAX_OVERFLOW ({pool_capacity}) debe ser >= THREADPOOL_SIZE "
+                f"({self.THREADPOOL_SIZE})"
+            )
 
-settings = get_settings()
\ No newline at end of file
+# Instancia única e inmutable, creada una sola vez al importar el módulo
+settings = Settings()
\ No newline at end of file
@@ -1,11 +1,35 @@
+import hashlib
+import logging
+import threading
+import time
 from datetime import datetime, timedelta, timezone
-from jose import JWTError, jwt
+from typing import Optional, Tuple
+import jwt
+from cachetools import TTLCache
 from passlib.context import CryptContext
 from app.core.config import settings
 
-# Contexto para hashear contraseñas de forma segura utilizando bcrypt.
-# 'deprecated="auto"' permite la migración automática a esquemas más nuevos si es necesario.
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Nunca registrar SECRET_KEY ni tokens en claro.
+logger = logging.getLogger(__name__)
+
+# Contexto para hashear contraseñas de forma segura.
+# Los hashes nuevos usan argon2id; bcrypt se mantiene para verificar los hashes existentes.
+# 'deprecated="auto"' marca bcrypt como obsoleto para que se re-hashee con argon2 en el siguiente login.
+pwd_context = CryptContext(
+    schemes=["argon2", "bcrypt"],
+    default="argon2",
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS,
+    argon2__time_cost=settings.ARGON2_TIME_COST,
+    argon2__memory_cost=settings.ARGON2_MEMORY_COST,
+    argon2__parallelism=settings.ARGON2_PARALLELISM,
+)
+
+# Caché acotada de tokens ya verificados: SHA-256 del token -> (username, exp).
+# Evita repetir la decodificación y la verificación de la firma en cada petición
+# autenticada. La clave es el hash y no el token en claro.
+_token_cache = TTLCache(maxsize=settings.TOKEN_CACHE_MAXSIZE, ttl=settings.TOKEN_CACHE_TTL_SECONDS)
+_token_cache_lock = threading.Lock()
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
@@ -20,6 +44,20 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     return pwd_context.verify(plain_password, hashed_password)
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verifica una contraseña y, si su hash usa un esquema o coste obsoleto, genera uno nuevo.
+
+    Args:
+        plain_password (str): La contraseña en texto plano proporcionada por el usuario.
+        hashed_password (str): La contraseña hasheada almacenada en la base de datos.
+
+    Returns:
+        Tuple[bool, Optional[str]]: Si la contraseña es válida y el nuevo hash a almacenar
+                                    (None si el hash actual no necesita actualizarse).
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
 def get_password_hash(password: str) -> str:
     """
     Genera un hash seguro de una contraseña en texto plano.
@@ -53,12 +91,7 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
         expire = datetime.now(timezone.utc) + timedelta(minutes=15)
     
     to_encode.update({"exp": expire}) # Añade el tiempo de expiración al payload
-    print(f"DEBUG: SECRET_KEY used for encoding: {settings.SECRET_KEY}")
-    print(f"DEBUG: ALGORITHM used for encoding: {settings.ALGORITHM}")
-    print(f"DEBUG: Token payload before encoding: {to_encode}")
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-    print(f"DEBUG: Generated JWT: {encoded_jwt}")
-    return encoded_jwt
+    return jwt.encode(to_encode, settings.SECRET_KEY_BYTES, algorithm=settings.ALGORITHM)
 
 def verify_token(token: str):
     """
@@ -70,20 +103,33 @@ def verify_token(token: str):
     Returns:
         Optional[str]: El nombre de usuario (subject) del token si es válido, de lo contrario None.
     """
+    # Con la caché desactivada (por defecto) no se calcula el hash ni se toma el lock
+    cache_key = None
+    if settings.TOKEN_CACHE_ENABLED:
+        cache_key = hashlib.sha256(token.encode()).digest()
+        with _token_cache_lock:
+            cached = _token_cache.get(cache_key)
+        if cached is not None:
+            username, expires_at = cached
+            if expires_at > time.time():
+                return username
+            with _token_cache_lock:
+                _token_cache.pop(cache_key, None)
+
     try:
-        print(f"DEBUG: SECRET_KEY used for decoding: {settings.SECRET_KEY}")
-        print(f"DEBUG: ALGORITHM used for decoding: {settings.ALGORITHM}")
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        print(f"DEBUG: Decoded JWT payload: {payload}")
-        username: str = payload.get("sub")
-        if username is None:
-            print("DEBUG: Token valid but 'sub' (username) is missing or None.")
-            return None
-        print(f"DEBUG: Username from token: {username}")
-        return username
-    except JWTError as e:
-        print(f"DEBUG: JWTError during token verification: {e}")
+        # Una sola decodificación: firma, expiración y presencia de 'exp'/'sub' se validan juntas
+        payload = jwt.decode(
+            token,
+            settings.SECRET_KEY_BYTES,
+            algorithms=[settings.ALGORITHM],
+            options={"require": ["exp", "sub"]},
+        )
+    except jwt.InvalidTokenError as e:
+        logger.debug("Token JWT inválido: %s", e)
         return None
-    except Exception as e:
-        print(f"DEBUG: Unexpected error during token verification: {e}")
-        return None
\ No newline at end of file
+
+    username: str = payload["sub"]
+    if cache_key is not None:
+        with _token_cache_lock:
+            _token_cache[cache_key] = (username, payload["exp"])
+    return username
\ No newline at end of file
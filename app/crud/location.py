@@ -1,20 +1,24 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List, Optional
-from app.models.location import Location, Category
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import func, or_, select
+from typing import List, Optional, Set
+from app.models.location import Location, Category, geography_point, postgis_enabled
 from app.schemas.location import LocationCreate, LocationUpdate, CategoryCreate
+from app.core.config import settings
 import math
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0  # Radio medio de la Tierra en km
 
 def get_location_by_id(db: Session, location_id: int, user_id: int) -> Optional[Location]:
-    return db.query(Location).filter(
+    return db.scalars(select(Location).options(joinedload(Location.category)).where(
         Location.id == location_id,
         Location.owner_id == user_id
-    ).first()
+    )).first()
 
 def get_user_locations(db: Session, user_id: int, skip: int = 0, limit: int = 100) -> List[Location]:
-    return db.query(Location).filter(
+    return db.scalars(select(Location).where(
         Location.owner_id == user_id
-    ).offset(skip).limit(limit).all()
+    ).offset(skip).limit(limit)).all()
 
 def create_location(db: Session, location: LocationCreate, user_id: int) -> Location:
     db_location = Location(**location.model_dump(), owner_id=user_id)
@@ -23,6 +27,28 @@ def create_location(db: Session, location: LocationCreate, user_id: int) -> Loca
     db.refresh(db_location)
     return db_location
 
+def create_locations(db: Session, locations: List[LocationCreate], user_id: int) -> List[Location]:
+    """
+    Crea varias ubicaciones del usuario en una sola transacción.
+
+    Args:
+        db (Session): Sesión de la base de datos.
+        locations (List[LocationCreate]): Esquemas Pydantic con los datos de cada ubicación.
+        user_id (int): El ID del usuario propietario de las ubicaciones.
+
+    Returns:
+        List[Location]: Las ubicaciones creadas, en el mismo orden de entrada.
+    """
+    db_locations = [Location(**location.model_dump(), owner_id=user_id) for location in locations]
+    db.add_all(db_locations)
+    db.flush()
+    location_ids = [db_location.id for db_location in db_locations]
+    db.commit()
+
+    # Una sola consulta recarga todas las filas (en lugar de un refresh por ubicación)
+    db.scalars(select(Location).where(Location.id.in_(location_ids))).all()
+    return db_locations
+
 def update_location(db: Session, location_id: int, location_update: LocationUpdate, user_id: int):
     """
     Actualiza una ubicación existente en la base de datos.
@@ -60,7 +86,11 @@ def delete_location(db: Session, location_id: int, user_id: int):
     Returns:
         Optional[Location]: La ubicación eliminada o None si no se encontró o no pertenece al usuario.
     """
-    db_location = get_location_by_id(db, location_id, user_id)
+    # La respuesta no incluye la categoría, así que no se une su tabla
+    db_location = db.scalars(select(Location).where(
+        Location.id == location_id,
+        Location.owner_id == user_id
+    )).first()
     if not db_location:
         return None
     
@@ -68,24 +98,134 @@ def delete_location(db: Session, location_id: int, user_id: int):
     db.commit()
     return db_location
 
+def _bounding_box(center_lat: float, center_lng: float, radius_km: float):
+    """
+    Calcula el rectángulo (en grados) que contiene el círculo de búsqueda.
+
+    Returns:
+        tuple: (min_lat, max_lat, min_lng, max_lng). Los límites de longitud son None
+               cuando el círculo alcanza un polo y no se puede acotar la longitud.
+    """
+    angular_radius = radius_km / EARTH_RADIUS_KM
+    lat_delta = math.degrees(angular_radius)
+    min_lat = center_lat - lat_delta
+    max_lat = center_lat + lat_delta
+
+    # Extensión máxima en longitud del círculo: asin(sin(d) / cos(lat))
+    sin_ratio = math.sin(angular_radius) / max(math.cos(math.radians(center_lat)), 1e-12)
+    if min_lat <= -90.0 or max_lat >= 90.0 or sin_ratio >= 1.0:
+        return max(min_lat, -90.0), min(max_lat, 90.0), None, None
+
+    lng_delta = math.degrees(math.asin(sin_ratio))
+    return min_lat, max_lat, center_lng - lng_delta, center_lng + lng_delta
+
 def search_locations_nearby(
     db: Session, 
     user_id: int, 
     center_lat: float, 
     center_lng: float, 
-    radius_km: float
+    radius_km: float,
+    skip: int = 0,
+    limit: int = 100
 ) -> List[Location]:
-    # TODO: optimize with spatial index for large datasets
-    locations = db.query(Location).filter(Location.owner_id == user_id).all()
-    
-    return [
-        location for location in locations
-        if calculate_distance(center_lat, center_lng, location.latitude, location.longitude) <= radius_km
-    ]
+    """
+    Busca las ubicaciones del usuario dentro de un radio dado, ordenadas de la más
+    cercana a la más lejana.
+
+    El filtrado grueso se hace en la base de datos con un rectángulo de latitud/longitud
+    (aprovechando el índice compuesto de `Location`), y la distancia Haversine exacta solo
+    se calcula sobre los candidatos devueltos. El radio se limita a
+    `settings.MAX_SEARCH_RADIUS_KM` y solo se cargan como objetos ORM las filas de la
+    página solicitada.
+    En PostgreSQL con la extensión PostGIS instalada, la búsqueda se delega en
+    `_search_locations_nearby_postgis`.
+
+    Args:
+        db (Session): Sesión de la base de datos.
+        user_id (int): El ID del usuario propietario de las ubicaciones.
+        center_lat (float): Latitud del centro de búsqueda.
+        center_lng (float): Longitud del centro de búsqueda.
+        radius_km (float): Radio de búsqueda en kilómetros.
+        skip (int): Número de resultados a omitir (para paginación).
+        limit (int): Número máximo de resultados a devolver (para paginación).
+
+    Returns:
+        List[Location]: Las ubicaciones que se encuentran dentro del radio.
+    """
+    radius_km = min(radius_km, settings.MAX_SEARCH_RADIUS_KM)
+    if postgis_enabled(db.get_bind()):
+        return _search_locations_nearby_postgis(db, user_id, center_lat, center_lng, radius_km, skip, limit)
+
+    min_lat, max_lat, min_lng, max_lng = _bounding_box(center_lat, center_lng, radius_km)
+
+    # Solo se leen las columnas (precalculadas) necesarias para el cálculo de distancia
+    query = select(Location.id, Location.lng_rad, Location.sin_lat, Location.cos_lat).where(
+        Location.owner_id == user_id,
+        Location.latitude.between(min_lat, max_lat)
+    )
+    if min_lng is not None:
+        if min_lng < -180.0:
+            # El rectángulo cruza el antimeridiano por el oeste
+            query = query.where(or_(Location.longitude >= min_lng + 360.0, Location.longitude <= max_lng))
+        elif max_lng > 180.0:
+            # El rectángulo cruza el antimeridiano por el este
+            query = query.where(or_(Location.longitude >= min_lng, Location.longitude <= max_lng - 360.0))
+        else:
+            query = query.where(Location.longitude.between(min_lng, max_lng))
+
+    candidates = db.execute(query).all()
+    if not candidates:
+        return []
+
+    ids, lng_rads, sin_lats, cos_lats = (np.asarray(column) for column in zip(*candidates))
+    cosines = central_angle_cosines(center_lat, center_lng, lng_rads, sin_lats, cos_lats)
+    # distancia <= radio  <=>  cos(ángulo central) >= cos(radio / R); a mayor coseno, más cerca
+    within = np.flatnonzero(cosines >= math.cos(radius_km / EARTH_RADIUS_KM))
+    by_distance = within[np.argsort(-cosines[within], kind="stable")]
+    page_ids = ids[by_distance[skip:skip + limit]].tolist()
+    if not page_ids:
+        return []
+
+    # Se hidratan como objetos ORM únicamente las filas de la página, en orden de distancia
+    locations = db.scalars(select(Location).where(Location.id.in_(page_ids))).all()
+    locations_by_id = {location.id: location for location in locations}
+    return [locations_by_id[location_id] for location_id in page_ids]
+
+def _search_locations_nearby_postgis(
+    db: Session,
+    user_id: int,
+    center_lat: float,
+    center_lng: float,
+    radius_km: float,
+    skip: int,
+    limit: int
+) -> List[Location]:
+    """
+    Variante de `search_locations_nearby` para PostgreSQL + PostGIS: el filtro por radio
+    (`ST_DWithin`) usa el índice GiST `ix_locations_geography`, y el orden por distancia
+    y la paginación se resuelven en la propia consulta.
+    """
+    location_point = geography_point(Location.longitude, Location.latitude)
+    center_point = geography_point(center_lng, center_lat)
+
+    return db.scalars(
+        select(Location)
+        .where(
+            Location.owner_id == user_id,
+            func.ST_DWithin(location_point, center_point, radius_km * 1000.0)
+        )
+        .order_by(func.ST_Distance(location_point, center_point), Location.id)
+        .offset(skip)
+        .limit(limit)
+    ).all()
 
 def calculate_distance(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
-    """Haversine distance calculation in km"""
-    R = 6371.0  # Earth radius in km
+    """
+    Distancia Haversine en km entre dos puntos.
+    Implementación escalar de referencia: la búsqueda usa `central_angle_cosines`, y los tests
+    comprueban que ambas coinciden.
+    """
+    R = EARTH_RADIUS_KM
     
     lat1_rad, lng1_rad = math.radians(lat1), math.radians(lng1)
     lat2_rad, lng2_rad = math.radians(lat2), math.radians(lng2)
@@ -99,6 +239,25 @@ def calculate_distance(lat1: float, lng1: float, lat2: float, lng2: float) -> fl
     
     return R * c
 
+def central_angle_cosines(
+    center_lat: float,
+    center_lng: float,
+    lng_rads: np.ndarray,
+    sin_lats: np.ndarray,
+    cos_lats: np.ndarray
+) -> np.ndarray:
+    """
+    Coseno del ángulo central entre un punto y cada ubicación (ley esférica de los cosenos),
+    calculado en un solo paso con NumPy a partir de las columnas precalculadas de `Location`.
+    Solo requiere un coseno por fila; la distancia en km es R·acos(valor), pero para filtrar
+    y ordenar basta con comparar los cosenos.
+    """
+    lat0_rad = math.radians(center_lat)
+    cosines = (math.sin(lat0_rad) * np.asarray(sin_lats, dtype=np.float64) +
+               math.cos(lat0_rad) * np.asarray(cos_lats, dtype=np.float64) *
+               np.cos(np.asarray(lng_rads, dtype=np.float64) - math.radians(center_lng)))
+    return np.clip(cosines, -1.0, 1.0)
+
 # Funciones CRUD para categorías
 def get_categories(db: Session, skip: int = 0, limit: int = 100):
     """
@@ -112,7 +271,7 @@ def get_categories(db: Session, skip: int = 0, limit: int = 100):
     Returns:
         List[Category]: Una lista de objetos Category.
     """
-    return db.query(Category).offset(skip).limit(limit).all()
+    return db.scalars(select(Category).offset(skip).limit(limit)).all()
 
 def get_category_by_id(db: Session, category_id: int):
     """
@@ -125,7 +284,22 @@ def get_category_by_id(db: Session, category_id: int):
     Returns:
         Optional[Category]: La categoría encontrada o None si no existe.
     """
-    return db.query(Category).filter(Category.id == category_id).first()
+    return db.get(Category, category_id)
+
+def get_existing_category_ids(db: Session, category_ids: Set[int]) -> Set[int]:
+    """
+    Devuelve cuáles de los IDs de categoría indicados existen, con una sola consulta.
+
+    Args:
+        db (Session): Sesión de la base de datos.
+        category_ids (Set[int]): Los IDs de categoría a comprobar.
+
+    Returns:
+        Set[int]: El subconjunto de IDs que corresponde a categorías existentes.
+    """
+    if not category_ids:
+        return set()
+    return set(db.scalars(select(Category.id).where(Category.id.in_(category_ids))).all())
 
 def create_category(db: Session, category: CategoryCreate):
     """
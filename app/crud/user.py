@@ -1,7 +1,10 @@
+from typing import List, Tuple
+from sqlalchemy import or_, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from app.models.user import User
 from app.schemas.user import UserCreate
-from app.core.security import get_password_hash, verify_password
+from app.core.security import get_password_hash, verify_and_update_password
 
 def get_user_by_email(db: Session, email: str):
     """
@@ -14,7 +17,7 @@ def get_user_by_email(db: Session, email: str):
     Returns:
         Optional[User]: El objeto User si se encuentra, de lo contrario None.
     """
-    return db.query(User).filter(User.email == email).first()
+    return db.scalars(select(User).where(User.email == email)).first()
 
 def get_user_by_username(db: Session, username: str):
     """
@@ -27,7 +30,7 @@ def get_user_by_username(db: Session, username: str):
     Returns:
         Optional[User]: El objeto User si se encuentra, de lo contrario None.
     """
-    return db.query(User).filter(User.username == username).first()
+    return db.scalars(select(User).where(User.username == username)).first()
 
 def get_user_by_id(db: Session, user_id: int):
     """
@@ -40,7 +43,26 @@ def get_user_by_id(db: Session, user_id: int):
     Returns:
         Optional[User]: El objeto User si se encuentra, de lo contrario None.
     """
-    return db.query(User).filter(User.id == user_id).first()
+    return db.get(User, user_id)
+
+def get_user_by_email_or_username(db: Session, email: str, username: str) -> List[Tuple[str, str]]:
+    """
+    Busca en una sola consulta los usuarios que ya usan el email o el nombre de usuario dados.
+    Solo se leen esas dos columnas, sin construir objetos User completos.
+
+    Args:
+        db (Session): La sesión de la base de datos.
+        email (str): La dirección de correo electrónico a comprobar.
+        username (str): El nombre de usuario a comprobar.
+
+    Returns:
+        List[Tuple[str, str]]: Pares (email, username) de los usuarios que coinciden (como máximo dos).
+    """
+    return db.execute(
+        select(User.email, User.username)
+        .where(or_(User.email == email, User.username == username))
+        .limit(2)
+    ).all()
 
 def create_user(db: Session, user: UserCreate):
     """
@@ -51,6 +73,9 @@ def create_user(db: Session, user: UserCreate):
         db (Session): La sesión de la base de datos.
         user (UserCreate): El esquema Pydantic con los datos del nuevo usuario.
 
+    Raises:
+        IntegrityError: Si el email o el nombre de usuario ya existen (restricción única).
+
     Returns:
         User: El objeto User recién creado.
     """
@@ -61,13 +86,18 @@ def create_user(db: Session, user: UserCreate):
         hashed_password=hashed_password
     )
     db.add(db_user)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise
     db.refresh(db_user)
     return db_user
 
 def authenticate_user(db: Session, username: str, password: str):
     """
     Autentica un usuario verificando su nombre de usuario y contraseña.
+    Si el hash almacenado usa un esquema obsoleto (p. ej. bcrypt), se reemplaza por uno nuevo.
 
     Args:
         db (Session): La sesión de la base de datos.
@@ -80,6 +110,10 @@ def authenticate_user(db: Session, username: str, password: str):
     user = get_user_by_username(db, username)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    verified, new_hash = verify_and_update_password(password, user.hashed_password)
+    if not verified:
         return False
+    if new_hash:
+        user.hashed_password = new_hash
+        db.commit()
     return user
\ No newline at end of file
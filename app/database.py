@@ -1,16 +1,43 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool, StaticPool
 from app.core.config import settings
 
+def _engine_options(database_url: str) -> dict:
+    """
+    Devuelve las opciones de `create_engine` adecuadas para el tipo de base de datos.
+
+    - SQLite: 'check_same_thread': False permite que varios hilos usen la conexión.
+      Para bases de datos en fichero se usa NullPool: abrir una conexión SQLite es barato
+      y así el número de peticiones concurrentes no queda limitado por el tamaño del pool.
+      Para bases de datos en memoria se usa StaticPool: todos los hilos comparten la única
+      conexión (y por tanto la misma base de datos), en lugar de una base vacía por hilo.
+    - Otras bases de datos: pool con capacidad (DB_POOL_SIZE + DB_MAX_OVERFLOW) de al menos
+      THREADPOOL_SIZE conexiones, validado en `Settings`, con 'pool_pre_ping' para descartar
+      conexiones caídas y 'pool_recycle' para renovarlas antes de que el servidor las cierre.
+    """
+    url = make_url(database_url)
+    if url.get_backend_name() == "sqlite":
+        options = {"connect_args": {"check_same_thread": False}}
+        if url.database in (None, "", ":memory:"):
+            options["poolclass"] = StaticPool
+        else:
+            options["poolclass"] = NullPool
+        return options
+
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+
 # Configuración del motor de la base de datos.
 # Utiliza la URL de la base de datos definida en las configuraciones de la aplicación.
-# Para SQLite, 'check_same_thread': False es necesario para permitir múltiples hilos
-# interactuar con la misma conexión de base de datos.
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False}  # Solo para SQLite, no usar en producción con otras DBs
-)
+# Como el pool cubre el threadpool (ver `Settings`), `Depends(get_db)` por petición no agota las conexiones.
+engine = create_engine(settings.DATABASE_URL, **_engine_options(settings.DATABASE_URL))
 
 # Configuración de la sesión de la base de datos.
 # SessionLocal será una clase de sesión de base de datos.
@@ -1,8 +1,33 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Text
-from sqlalchemy.orm import relationship
+import logging
+import math
+import weakref
+from sqlalchemy import (
+    Column, Integer, String, Float, ForeignKey, DateTime, Text, Index,
+    bindparam, cast, event, inspect, literal_column, select, text, update
+)
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import relationship, validates
 from sqlalchemy.sql import func
+from sqlalchemy.types import UserDefinedType
 from app.database import Base
 
+logger = logging.getLogger(__name__)
+
+class Geography(UserDefinedType):
+    """Tipo `geography` de PostGIS, usado solo en expresiones (no como columna)."""
+    cache_ok = True
+
+    def get_col_spec(self, **kw):
+        return "geography"
+
+def geography_point(longitude, latitude):
+    """
+    Expresión PostGIS `ST_SetSRID(ST_MakePoint(lng, lat), 4326)::geography`.
+    Se usa tanto en el índice GiST de `Location` como en las consultas que deben aprovecharlo;
+    el SRID va como literal para que la expresión de la consulta coincida con la del índice.
+    """
+    return cast(func.ST_SetSRID(func.ST_MakePoint(longitude, latitude), literal_column("4326")), Geography())
+
 class Category(Base):
     __tablename__ = "categories"
     
@@ -29,6 +54,12 @@ class Location(Base):
     latitude = Column(Float, nullable=False)
     longitude = Column(Float, nullable=False)
     
+    # Valores trigonométricos precalculados al escribir (ver los validadores más abajo),
+    # para que la búsqueda por proximidad no repita ese cálculo en cada consulta
+    lng_rad = Column(Float, nullable=False)
+    sin_lat = Column(Float, nullable=False)
+    cos_lat = Column(Float, nullable=False)
+    
     # Claves foráneas para las relaciones
     category_id = Column(Integer, ForeignKey("categories.id"), nullable=True)
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -39,4 +70,145 @@ class Location(Base):
     
     # Definición de relaciones con otros modelos
     category = relationship("Category", back_populates="locations")
-    owner = relationship("User", back_populates="locations")
\ No newline at end of file
+    owner = relationship("User", back_populates="locations")
+
+    @validates("latitude")
+    def _validate_latitude(self, key, latitude):
+        # Mantiene sin_lat/cos_lat sincronizados con la latitud
+        if latitude is not None:
+            lat_rad = math.radians(latitude)
+            self.sin_lat = math.sin(lat_rad)
+            self.cos_lat = math.cos(lat_rad)
+        return latitude
+
+    @validates("longitude")
+    def _validate_longitude(self, key, longitude):
+        # Mantiene lng_rad sincronizado con la longitud
+        if longitude is not None:
+            self.lng_rad = math.radians(longitude)
+        return longitude
+
+    # Índice compuesto para la búsqueda por proximidad: filtra por propietario y
+    # acota por rango de latitud/longitud sin recorrer toda la tabla.
+    __table_args__ = (
+        Index("ix_locations_owner_lat_lng", "owner_id", "latitude", "longitude"),
+        # En PostgreSQL, índice espacial GiST sobre el punto geográfico para ST_DWithin
+        Index(
+            "ix_locations_geography",
+            geography_point(longitude, latitude),
+            postgresql_using="gist",
+        ).ddl_if(dialect="postgresql", callable_=lambda ddl, target, bind, **kw: _postgis_installed(bind)),
+    )
+
+def _postgis_installed(connection) -> bool:
+    """Indica si la extensión PostGIS está instalada en la base de datos de `connection` (PostgreSQL)."""
+    if connection is None:
+        # Compilación de DDL sin conexión (p. ej. para mostrar el esquema)
+        return True
+    return connection.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'postgis'")).first() is not None
+
+def ensure_postgis_extension(connection) -> bool:
+    """
+    Intenta crear la extensión PostGIS (PostgreSQL). Si el servidor no la tiene disponible o el
+    rol no puede crear extensiones, se registra un aviso y la aplicación usa la búsqueda por
+    proximidad genérica (rectángulo + NumPy) en lugar de ST_DWithin.
+
+    Args:
+        connection: Conexión a la base de datos, dentro de una transacción.
+
+    Returns:
+        bool: True si PostGIS queda instalado.
+    """
+    if connection.dialect.name != "postgresql":
+        return False
+    if _postgis_installed(connection):
+        return True
+    try:
+        # SAVEPOINT: un fallo aquí no debe abortar la transacción de create_all
+        with connection.begin_nested():
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS postgis"))
+    except DBAPIError as exc:
+        logger.warning("PostGIS no disponible, se usará la búsqueda por proximidad sin índice GiST: %s", exc.orig)
+        return False
+    return True
+
+# La extensión PostGIS debe existir antes de crear el índice geográfico (si se puede)
+@event.listens_for(Location.__table__, "before_create")
+def _create_postgis_extension(target, connection, **kw):
+    ensure_postgis_extension(connection)
+
+# Resultado de la detección de PostGIS por engine, para no consultarlo en cada búsqueda
+_postgis_by_engine = weakref.WeakKeyDictionary()
+
+def postgis_enabled(bind) -> bool:
+    """
+    Indica si las búsquedas pueden usar PostGIS: solo en PostgreSQL con la extensión instalada.
+    La comprobación se hace una vez por engine y se guarda en memoria.
+
+    Args:
+        bind: El engine o conexión que usa la sesión.
+    """
+    if bind.dialect.name != "postgresql":
+        return False
+    engine = bind.engine
+    enabled = _postgis_by_engine.get(engine)
+    if enabled is None:
+        with engine.connect() as connection:
+            enabled = _postgis_installed(connection)
+        _postgis_by_engine[engine] = enabled
+    return enabled
+
+def upgrade_locations_table(engine) -> None:
+    """
+    Actualiza una tabla `locations` creada antes de las columnas trigonométricas, ya que
+    `create_all` no modifica tablas existentes: añade las columnas que falten, las rellena a
+    partir de latitude/longitude y crea los índices que no existan. Es idempotente y se
+    ejecuta en una sola transacción.
+
+    Args:
+        engine (Engine): El engine de la base de datos (no una conexión).
+    """
+    table = Location.__table__
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        if not inspector.has_table(table.name):
+            return
+
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        missing = [name for name in ("lng_rad", "sin_lat", "cos_lat") if name not in existing]
+
+        if "lat_rad" in existing:
+            # Columna de una versión anterior que ya no se escribe (y es NOT NULL)
+            conn.execute(text(f"ALTER TABLE {table.name} DROP COLUMN lat_rad"))
+
+        if missing:
+            for name in missing:
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {name} FLOAT NOT NULL DEFAULT 0"))
+
+            # Relleno en Python (SQLite no siempre incluye funciones trigonométricas)
+            rows = conn.execute(select(table.c.id, table.c.latitude, table.c.longitude)).all()
+            if rows:
+                conn.execute(
+                    update(table).where(table.c.id == bindparam("row_id")).values(
+                        lng_rad=bindparam("row_lng_rad"),
+                        sin_lat=bindparam("row_sin_lat"),
+                        cos_lat=bindparam("row_cos_lat"),
+                        # No es un cambio del usuario: se evita el onupdate de updated_at
+                        updated_at=table.c.updated_at,
+                    ),
+                    [
+                        {
+                            "row_id": row_id,
+                            "row_lng_rad": math.radians(longitude),
+                            "row_sin_lat": math.sin(math.radians(latitude)),
+                            "row_cos_lat": math.cos(math.radians(latitude)),
+                        }
+                        for row_id, latitude, longitude in rows
+                    ],
+                )
+
+        # create_all no lanza before_create sobre tablas existentes: la extensión PostGIS
+        # se intenta crear aquí, antes del índice geográfico (que solo se crea si existe)
+        ensure_postgis_extension(conn)
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
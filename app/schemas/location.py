@@ -1,6 +1,19 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter
 from datetime import datetime
-from typing import Optional
+from typing import Any, List, Optional, Type, TypeVar
+
+SchemaT = TypeVar("SchemaT", bound=BaseModel)
+
+def construct_from_orm(schema: Type[SchemaT], obj: Any) -> SchemaT:
+    """
+    Construye un esquema de respuesta a partir de un objeto ORM sin volver a validarlo.
+
+    Invariante: solo debe usarse con filas leídas de la base de datos, cuyos tipos ya están
+    garantizados por las columnas de SQLAlchemy y que fueron validadas al escribirse, y con
+    esquemas planos (sin modelos anidados). Los datos de entrada del cliente (LocationCreate,
+    LocationUpdate, UserCreate, ...) se siguen validando siempre.
+    """
+    return schema.model_construct(**{name: getattr(obj, name) for name in schema.model_fields})
 
 class CategoryBase(BaseModel):
     name: str
@@ -13,7 +26,7 @@ class Category(CategoryBase):
     id: int
     created_at: datetime
 
-    model_config = {"from_attributes": True}
+    model_config = {"from_attributes": True, "frozen": True}
 
 class LocationBase(BaseModel):
     """
@@ -53,9 +66,35 @@ class Location(LocationBase):
     owner_id: int
     created_at: datetime
     updated_at: Optional[datetime] = None
+
+    model_config = {"from_attributes": True, "frozen": True}
+
+class LocationWithCategory(Location):
+    """
+    Esquema de una ubicación con su categoría anidada.
+    Solo lo usan los endpoints de una única ubicación, que cargan la categoría en la misma consulta;
+    el resto de respuestas devuelven la ubicación plana.
+    """
     category: Optional[Category] = None
 
-    model_config = {"from_attributes": True}
+class LocationSummary(BaseModel):
+    """
+    Esquema reducido de una ubicación para los listados.
+    Solo incluye los campos necesarios para mostrarla en un mapa o lista, sin la categoría anidada
+    ni los timestamps, lo que abarata la serialización de respuestas con muchas filas.
+    """
+    id: int
+    name: str
+    latitude: float
+    longitude: float
+    category_id: Optional[int] = None
+
+    model_config = {"from_attributes": True, "frozen": True}
+
+# Adaptadores para serializar listados completos en una sola llamada (JSON en bytes),
+# creados una vez al importar el módulo para no reconstruir su esquema en cada petición.
+LocationSummaryListAdapter = TypeAdapter(List[LocationSummary])
+CategoryListAdapter = TypeAdapter(List[Category])
 
 class LocationSearch(BaseModel):
     """
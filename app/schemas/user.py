@@ -34,7 +34,7 @@ class User(UserBase):
     is_active: bool
     created_at: datetime
 
-    model_config = {"from_attributes": True}
+    model_config = {"from_attributes": True, "frozen": True}
 
 class Token(BaseModel):
     """
@@ -43,6 +43,8 @@ class Token(BaseModel):
     access_token: str
     token_type: str
 
+    model_config = {"frozen": True}
+
 class TokenData(BaseModel):
     """
     Esquema para los datos contenidos dentro de un token JWT.
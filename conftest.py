@@ -0,0 +1,27 @@
+"""
+Shared pytest configuration.
+Runs before any test module imports the app, so the settings below are picked up by app.core.config.
+"""
+import os
+
+import pytest
+
+# Cheap password hashing for tests: the suite registers and logs in users constantly, and
+# production-strength argon2id costs dominate its run time. Explicit env values still win.
+os.environ.setdefault("ARGON2_TIME_COST", "1")
+os.environ.setdefault("ARGON2_MEMORY_COST", "1024")  # KiB
+
+# Tests never touch the real database: the app engine points at a shared in-memory SQLite
+# database and the lifespan skips create_all (fixtures create the schema themselves)
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+os.environ.setdefault("AUTO_CREATE_TABLES", "False")
+
+@pytest.fixture(scope="session", autouse=True)
+def app_db_schema():
+    """Create the schema once on the app engine, for tests that use it without an override"""
+    from app.database import Base, engine
+    import app.models.location, app.models.user  # noqa: F401  (register the models on Base.metadata)
+    
+    Base.metadata.create_all(bind=engine)
+    yield
+    engine.dispose()
@@ -1,16 +1,31 @@
 # MapMyWorld API - Location management service
 
+from contextlib import asynccontextmanager
+
+from anyio import to_thread
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.security import OAuth2PasswordBearer
 
 from app.core.config import settings
 from app.database import engine, Base
+from app.models.location import upgrade_locations_table
 from app.api.v1.api import api_router
 from app.api.dependencies import oauth2_scheme # Importar el esquema de seguridad
+from app.api.middleware import AuthMiddleware
 
-# Auto-create tables for dev - TODO: replace with proper migrations
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Los endpoints son síncronos y FastAPI los ejecuta en el threadpool de AnyIO;
+    # se ajusta su tamaño para que no sea el cuello de botella con muchos clientes concurrentes.
+    to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
+    # Auto-create tables for dev (idempotent) - TODO: replace with proper migrations
+    if settings.AUTO_CREATE_TABLES:
+        Base.metadata.create_all(bind=engine)
+        # create_all no altera tablas existentes: añade y rellena las columnas nuevas de `locations`
+        upgrade_locations_table(engine)
+    yield
 
 # Definir el esquema de seguridad para OpenAPI
 security_schemes = {
@@ -26,9 +41,12 @@ app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
     description=settings.DESCRIPTION,
-    openapi_url="/api/v1/openapi.json",
-    docs_url="/docs",
-    redoc_url="/redoc",
+    openapi_url="/api/v1/openapi.json" if settings.ENABLE_DOCS else None,
+    docs_url="/docs" if settings.ENABLE_DOCS else None,
+    redoc_url="/redoc" if settings.ENABLE_DOCS else None,
+    lifespan=lifespan,
+    # orjson serializa las respuestas (listas de ubicaciones, floats, fechas) mucho más rápido que json
+    default_response_class=ORJSONResponse,
     # Añadir el esquema de seguridad a la configuración de OpenAPI
     openapi_extra={
         "components": {
@@ -44,15 +62,18 @@ app = FastAPI(
     swagger_ui_parameters={"locale": "en"}
 )
 
-# CORS setup - restrict origins in production
+# CORS setup - explicit allowlist, configured through CORS_ORIGINS
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=list(settings.CORS_ORIGINS),
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "PUT", "DELETE"],
+    allow_headers=["Authorization", "Content-Type"],
 )
 
+# Decodifica el token Bearer una vez por petición (ver app/api/middleware.py)
+app.add_middleware(AuthMiddleware)
+
 app.include_router(api_router, prefix="/api/v1")
 
 @app.get("/", tags=["General Information"])
@@ -60,7 +81,7 @@ def root():
     return {
         "message": "MapMyWorld API",
         "version": settings.VERSION,
-        "docs": "/docs"
+        "docs": app.docs_url
     }
 
 @app.get("/health", tags=["General Information"])
@@ -3,26 +3,29 @@ Test suite for MapMyWorld API
 Tests core functionality including authentication, CRUD operations, and geographic search
 """
 import pytest
-import os
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+import math
+import numpy as np
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 import time
 
 from main import app
 from app.database import get_db, Base
+from app.core.config import settings
+from app.api.v1.categories import invalidate_categories_cache
+from app.crud.location import EARTH_RADIUS_KM, calculate_distance, central_angle_cosines
+from app.models.location import upgrade_locations_table
 
-@pytest.fixture(scope="function")
+@pytest.fixture(scope="module")
 def test_db():
-    """Create test database"""
-    test_db_path = "test.db"
-    test_database_url = f"sqlite:///{test_db_path}"
-    
-    # Remove existing test database
-    if os.path.exists(test_db_path):
-        os.unlink(test_db_path)
-    
-    engine = create_engine(test_database_url, connect_args={"check_same_thread": False})
+    """Create in-memory test database once per module"""
+    # StaticPool: every thread (TestClient runs endpoints in a threadpool) shares the single
+    # connection, and with it the same in-memory database
+    engine = create_engine(
+        "sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
     TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
     
     Base.metadata.create_all(bind=engine)
@@ -36,16 +39,27 @@ def test_db():
     
     app.dependency_overrides[get_db] = override_get_db
     
-    yield test_db_path
+    yield engine
     
     app.dependency_overrides.clear()
+    engine.dispose()
 
-@pytest.fixture
-def client(test_db):
-    """Creates test client instance for each test"""
+@pytest.fixture(scope="module")
+def app_client(test_db):
+    """Creates a single test client (and runs the app lifespan) per module"""
     with TestClient(app) as test_client:
         yield test_client
 
+@pytest.fixture
+def client(app_client, test_db):
+    """Test client with empty tables for each test"""
+    # Delete children before parents to respect foreign keys
+    with test_db.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+    invalidate_categories_cache()
+    return app_client
+
 def get_unique_user_data():
     """Generate unique test user data"""
     import random
@@ -118,6 +132,25 @@ def test_user_registration_and_login(client):
     assert login_data["token_type"] == "bearer"
     assert len(login_data["access_token"]) > 50, "Token should contain valid data"
 
+def test_duplicate_registration(client):
+    """Test that email and username must be unique"""
+    user_data = get_unique_user_data()
+
+    response = client.post("/api/v1/auth/register", json=user_data)
+    assert response.status_code == 200, "Should successfully register new user"
+
+    # Same email, different username
+    duplicate_email = {**get_unique_user_data(), "email": user_data["email"]}
+    response = client.post("/api/v1/auth/register", json=duplicate_email)
+    assert response.status_code == 409, "Should reject duplicate email"
+    assert response.json()["detail"] == "Email already registered"
+
+    # Same username, different email
+    duplicate_username = {**get_unique_user_data(), "username": user_data["username"]}
+    response = client.post("/api/v1/auth/register", json=duplicate_username)
+    assert response.status_code == 409, "Should reject duplicate username"
+    assert response.json()["detail"] == "Username already taken"
+
 def test_authentication_required(client):
     """Test that protected endpoints require authentication"""
     location_data = {
@@ -130,6 +163,16 @@ def test_authentication_required(client):
     response = client.post("/api/v1/locations/", json=location_data)
     assert response.status_code == 401, "Should reject unauthenticated requests"
 
+def test_invalid_token_rejected(client):
+    """Test that malformed or tampered tokens are rejected"""
+    headers = register_and_login(client)
+    tampered = {"Authorization": headers["Authorization"] + "x"}
+
+    for _ in range(2):
+        response = client.get("/api/v1/locations/", headers=tampered)
+        assert response.status_code == 401, "Should reject tampered token"
+        assert response.headers["www-authenticate"] == "Bearer"
+
 def test_location_crud_complete(client):
     """Test complete CRUD operations for locations"""
     headers = register_and_login(client)
@@ -154,6 +197,7 @@ def test_location_crud_complete(client):
     read_response = client.get(f"/api/v1/locations/{location_id}", headers=headers)
     assert read_response.status_code == 200, "Should find the created location"
     assert read_response.json()["name"] == location_data["name"]
+    assert read_response.json()["category"] is None, "Location without category should have a null category"
     
     # READ ALL - List user locations
     list_response = client.get("/api/v1/locations/", headers=headers)
@@ -177,6 +221,7 @@ def test_location_crud_complete(client):
     # DELETE - Remove the location
     delete_response = client.delete(f"/api/v1/locations/{location_id}", headers=headers)
     assert delete_response.status_code == 200, "Should successfully delete location"
+    assert "category" not in delete_response.json(), "Delete should return the flat location"
     
     # Verify deletion
     get_deleted = client.get(f"/api/v1/locations/{location_id}", headers=headers)
@@ -184,6 +229,7 @@ def test_location_crud_complete(client):
 
 def test_categories_system(client):
     """Test category management system"""
+    headers = register_and_login(client)
     timestamp = str(int(time.time()))
     
     # Create new category
@@ -192,24 +238,52 @@ def test_categories_system(client):
         "description": "Food and dining establishments"
     }
     
-    create_response = client.post("/api/v1/categories/", json=category_data)
+    create_response = client.post("/api/v1/categories/", json=category_data, headers=headers)
     assert create_response.status_code == 201, "Should successfully create category"
     
     category = create_response.json()
     category_id = category["id"]
     assert category["name"] == category_data["name"]
     
-    # List categories
-    list_response = client.get("/api/v1/categories/")
+    # List categories (this response is cached)
+    list_response = client.get("/api/v1/categories/", headers=headers)
     assert list_response.status_code == 200, "Should successfully list categories"
     categories = list_response.json()
     assert any(cat["id"] == category_id for cat in categories), "Should include created category"
+    assert "created_at" in categories[0], "Should serialize all category fields"
+    
+    # Creating another category must invalidate the cached list
+    second_response = client.post(
+        "/api/v1/categories/", json={"name": f"Museums{timestamp}"}, headers=headers
+    )
+    assert second_response.status_code == 201, "Should successfully create second category"
+    second_id = second_response.json()["id"]
+    
+    categories = client.get("/api/v1/categories/", headers=headers).json()
+    assert {cat["id"] for cat in categories} == {category_id, second_id}, "Cached list should be refreshed"
     
     # Get specific category
-    get_response = client.get(f"/api/v1/categories/{category_id}")
+    get_response = client.get(f"/api/v1/categories/{category_id}", headers=headers)
     assert get_response.status_code == 200, "Should find the category"
     assert get_response.json()["name"] == category_data["name"]
 
+def test_categories_cache_skips_stale_fill(client, monkeypatch):
+    """Test that a list read before a concurrent invalidation is not stored in the cache"""
+    from app.api.v1 import categories as categories_api
+    headers = register_and_login(client)
+    original_get_categories = categories_api.crud_location.get_categories
+    
+    def get_categories_racing_create(db, skip=0, limit=100):
+        rows = original_get_categories(db, skip=skip, limit=limit)
+        # Simulates a create_category committing while this request is serializing
+        categories_api.invalidate_categories_cache()
+        return rows
+    
+    monkeypatch.setattr(categories_api.crud_location, "get_categories", get_categories_racing_create)
+    response = client.get("/api/v1/categories/", headers=headers)
+    assert response.status_code == 200
+    assert (0, 100) not in categories_api._categories_cache, "Stale list should not be cached"
+
 def test_geographic_search(client):
     """Test geographic proximity search functionality"""
     headers = register_and_login(client)
@@ -222,10 +296,10 @@ def test_geographic_search(client):
         {"name": "Far", "latitude": 20.0000, "longitude": -100.0000}      # ~100+ km away
     ]
     
-    # Create all test locations
-    for location_data in locations_data:
-        response = client.post("/api/v1/locations/", json=location_data, headers=headers)
-        assert response.status_code == 201, f"Should create location: {location_data['name']}"
+    # Create all test locations in a single request
+    response = client.post("/api/v1/locations/bulk", json=locations_data, headers=headers)
+    assert response.status_code == 201, "Should create all locations"
+    assert [loc["name"] for loc in response.json()] == [loc["name"] for loc in locations_data]
     
     # Search with small radius (5 km) - should find 2 nearby locations
     search_response = client.get(
@@ -243,14 +317,28 @@ def test_geographic_search(client):
     assert "Nearby" in names, "Should include nearby point"
     assert "Far" not in names, "Should NOT include distant point"
     
-    # Search with large radius (200 km) - should find all locations
+    # Results are ordered by distance and paginated
+    first_page = client.get(
+        "/api/v1/locations/search/nearby?center_lat=19.4326&center_lng=-99.1332&radius_km=5&limit=1",
+        headers=headers
+    ).json()
+    assert [loc["name"] for loc in first_page] == ["Center"], "Closest location should come first"
+    
+    second_page = client.get(
+        "/api/v1/locations/search/nearby?center_lat=19.4326&center_lng=-99.1332&radius_km=5&skip=1&limit=1",
+        headers=headers
+    ).json()
+    assert [loc["name"] for loc in second_page] == ["Nearby"], "Second page should hold the next closest"
+    
+    # Search with large radius (200 km) - capped at MAX_SEARCH_RADIUS_KM, so "Far" (~110 km) is excluded
+    assert settings.MAX_SEARCH_RADIUS_KM < 110
     search_all = client.get(
         "/api/v1/locations/search/nearby?center_lat=19.4326&center_lng=-99.1332&radius_km=200",
         headers=headers
     )
     
     all_nearby = search_all.json()
-    assert len(all_nearby) == 3, f"200km radius should find all 3 locations, found {len(all_nearby)}"
+    assert len(all_nearby) == 2, f"Radius should be capped to {settings.MAX_SEARCH_RADIUS_KM} km, found {len(all_nearby)}"
 
 def test_location_with_category(client):
     """Test creating locations with assigned categories"""
@@ -262,7 +350,8 @@ def test_location_with_category(client):
         "name": f"Hotels{timestamp}",
         "description": "Accommodation establishments"
     }
-    category_response = client.post("/api/v1/categories/", json=category_data)
+    category_response = client.post("/api/v1/categories/", json=category_data, headers=headers)
+    assert category_response.status_code == 201, "Should create category"
     category_id = category_response.json()["id"]
     
     # Create location with assigned category
@@ -280,6 +369,23 @@ def test_location_with_category(client):
     location = location_response.json()
     assert location["category_id"] == category_id, "Should have assigned category ID"
     assert location["category"]["name"] == f"Hotels{timestamp}", "Should include category data"
+    
+    # Detail and update responses embed the category too
+    read_response = client.get(f"/api/v1/locations/{location['id']}", headers=headers)
+    assert read_response.json()["category"]["id"] == category_id, "Detail view should embed the category"
+    
+    update_response = client.put(
+        f"/api/v1/locations/{location['id']}", json={"name": "Plaza Hotel & Spa"}, headers=headers
+    )
+    assert update_response.json()["category"]["name"] == f"Hotels{timestamp}", "Update should embed the category"
+    
+    # List and delete responses stay flat
+    listed = client.get("/api/v1/locations/", headers=headers).json()
+    assert listed[0]["category_id"] == category_id
+    assert "category" not in listed[0], "List should not embed the category"
+    
+    delete_response = client.delete(f"/api/v1/locations/{location['id']}", headers=headers)
+    assert "category" not in delete_response.json(), "Delete should return the flat location"
 
 def test_data_validation(client):
     """Test input data validation"""
@@ -303,4 +409,70 @@ def test_data_validation(client):
     }
     
     response = client.post("/api/v1/locations/", json=incomplete_location, headers=headers)
-    assert response.status_code == 422, "Should reject incomplete data"
\ No newline at end of file
+    assert response.status_code == 422, "Should reject incomplete data"
+    
+    # Test search center out of range
+    response = client.get(
+        "/api/v1/locations/search/nearby?center_lat=91&center_lng=-99.1332&radius_km=5",
+        headers=headers
+    )
+    assert response.status_code == 422, "Should reject invalid search latitude"
+    
+    # Test bulk creation is all-or-nothing when a category does not exist
+    response = client.post("/api/v1/locations/bulk", json=[
+        {"name": "Valid", "latitude": 19.4326, "longitude": -99.1332},
+        {"name": "Bad category", "latitude": 19.4326, "longitude": -99.1332, "category_id": 9999}
+    ], headers=headers)
+    assert response.status_code == 404, "Should reject unknown category"
+    assert client.get("/api/v1/locations/", headers=headers).json() == [], "Nothing should be created"
+    
+    response = client.post("/api/v1/locations/bulk", json=[], headers=headers)
+    assert response.status_code == 422, "Should reject empty bulk request"
+
+def test_distance_kernel_matches_haversine():
+    """Test that the vectorized search kernel agrees with the reference Haversine distance"""
+    rng = np.random.default_rng(42)
+    center_lat, center_lng = 19.4326, -99.1332
+    # Mix of nearby points (search radius scale) and points anywhere on the globe
+    lats = np.concatenate([center_lat + rng.uniform(-0.5, 0.5, 200), rng.uniform(-89, 89, 200)])
+    lngs = np.concatenate([center_lng + rng.uniform(-0.5, 0.5, 200), rng.uniform(-180, 180, 200)])
+    
+    lat_rads = np.radians(lats)
+    cosines = central_angle_cosines(center_lat, center_lng, np.radians(lngs), np.sin(lat_rads), np.cos(lat_rads))
+    kernel_km = EARTH_RADIUS_KM * np.arccos(cosines)
+    
+    for lat, lng, distance in zip(lats, lngs, kernel_km):
+        assert math.isclose(distance, calculate_distance(center_lat, center_lng, lat, lng), abs_tol=1e-3), \
+            f"Kernel distance differs from Haversine at ({lat}, {lng})"
+
+def test_upgrade_locations_table():
+    """Test that a locations table from before the trig columns is upgraded and backfilled"""
+    engine = create_engine("sqlite:///:memory:", poolclass=StaticPool)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE locations (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, description TEXT, "
+            "latitude FLOAT NOT NULL, longitude FLOAT NOT NULL, category_id INTEGER, "
+            "owner_id INTEGER NOT NULL, created_at DATETIME, updated_at DATETIME)"
+        ))
+        conn.execute(text(
+            "INSERT INTO locations (name, latitude, longitude, owner_id) VALUES ('Old', 30.0, -100.0, 1)"
+        ))
+    
+    # Running it twice must be harmless
+    upgrade_locations_table(engine)
+    upgrade_locations_table(engine)
+    
+    columns = {column["name"] for column in inspect(engine).get_columns("locations")}
+    assert {"lng_rad", "sin_lat", "cos_lat"} <= columns, "Should add the trig columns"
+    indexes = {index["name"] for index in inspect(engine).get_indexes("locations")}
+    assert "ix_locations_owner_lat_lng" in indexes, "Should create the search index"
+    
+    with engine.connect() as conn:
+        lng_rad, sin_lat, cos_lat, updated_at = conn.execute(
+            text("SELECT lng_rad, sin_lat, cos_lat, updated_at FROM locations")
+        ).one()
+    assert updated_at is None, "Backfill should not touch updated_at"
+    assert math.isclose(lng_rad, math.radians(-100.0))
+    assert math.isclose(sin_lat, 0.5)
+    assert math.isclose(cos_lat, math.sqrt(3) / 2)
+    engine.dispose()